@@ -1,8 +1,13 @@
 import os
 import logging
-import random
+import hashlib
+import secrets
 import string
 import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
 from datetime import datetime, timedelta
 import psycopg2
 from psycopg2 import pool
@@ -13,18 +18,26 @@ from telegram import (
 )
 from telegram.ext import (
     ApplicationBuilder, CommandHandler, MessageHandler, CallbackQueryHandler,
-    ContextTypes, filters, Application
+    ContextTypes, filters, Application, ApplicationHandlerStop
 )
-from telegram.error import BadRequest, Forbidden, TimedOut
+from telegram.error import BadRequest, Forbidden, RetryAfter, TimedOut
 
 # --- Configuration ---
 TOKEN = os.environ.get("TOKEN")
 WEB_APP_URL = os.environ.get("WEB_APP_URL", "")  # Only for referral links, etc.
 try:
-    ADMIN_IDS = [int(x) for x in os.environ.get("ADMIN_IDS", "").split(',') if x and x.isdigit()]
+    ADMIN_IDS = frozenset(int(x) for x in os.environ.get("ADMIN_IDS", "").split(',') if x and x.isdigit())
 except ValueError:
-    ADMIN_IDS = []
+    ADMIN_IDS = frozenset()
 DATABASE_URL = os.environ.get("DATABASE_URL")
+# DB work runs in asyncio's default thread pool, which has at most 32 workers,
+# so DB_POOL_MAX=32 means a worker never finds the pool exhausted.
+# psycopg2 closes a returned connection once DB_POOL_MIN idle ones are pooled,
+# so every checkout beyond DB_POOL_MIN concurrent ones pays a fresh connect;
+# set it to the expected steady-state concurrency, not just the idle floor.
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", "4"))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", "32"))
+UPDATE_CONCURRENCY = int(os.environ.get("UPDATE_CONCURRENCY", "64"))
 BACK_BUTTON_TEXT = "🔙 Back"
 
 if not all([TOKEN, DATABASE_URL]):
@@ -38,11 +51,16 @@ logging.basicConfig(
 logger = logging.getLogger('api.bot')
 
 # --- DB Pool ---
+# Point DATABASE_URL at PgBouncer (transaction pooling) in production; the
+# in-process pool then only needs to cover this worker's concurrency.
 db_pool = None
+def create_db_pool():
+    return psycopg2.pool.ThreadedConnectionPool(DB_POOL_MIN, DB_POOL_MAX, DATABASE_URL)
+
 def get_db_connection():
     global db_pool
     if db_pool is None:
-        db_pool = psycopg2.pool.SimpleConnectionPool(1, 5, DATABASE_URL)
+        db_pool = create_db_pool()
     return db_pool.getconn()
 
 def release_db_connection(conn):
@@ -50,15 +68,39 @@ def release_db_connection(conn):
     if db_pool:
         db_pool.putconn(conn)
 
+@contextmanager
+def db_connection(autocommit=False):
+    """Check out a pooled connection; the pool rolls back anything left uncommitted on release.
+
+    Single-statement reads pass autocommit=True so no BEGIN is sent and there is
+    no transaction for the pool to roll back when the connection is returned.
+    """
+    conn = get_db_connection()
+    try:
+        conn.autocommit = autocommit
+        yield conn
+    finally:
+        release_db_connection(conn)
+
+# Bump whenever the DDL in init_db changes so existing databases re-apply it.
+SCHEMA_VERSION = 1
+
 def init_db():
     global db_pool
     if db_pool is not None:
         logger.info("Database pool already initialized")
         return
-    db_pool = psycopg2.pool.SimpleConnectionPool(1, 5, DATABASE_URL)
-    conn = get_db_connection()
-    try:
+    db_pool = create_db_pool()
+    with db_connection() as conn:
         with conn.cursor() as cursor:
+            # Skip the DDL on restarts once this schema version has been applied.
+            cursor.execute("SELECT to_regclass('schema_version') IS NOT NULL")
+            if cursor.fetchone()[0]:
+                cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+                if cursor.fetchone()[0] >= SCHEMA_VERSION:
+                    logger.info("Database schema is at version %s", SCHEMA_VERSION)
+                    conn.commit()
+                    return
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS users (
                     user_id BIGINT PRIMARY KEY,
@@ -73,8 +115,10 @@ def init_db():
                     role TEXT DEFAULT 'user',
                     invalid_bingo_count INTEGER DEFAULT 0
                 );
-                CREATE INDEX IF NOT EXISTS idx_users_user_id ON users(user_id);
-                CREATE INDEX IF NOT EXISTS idx_users_referral_code ON users(referral_code);
+                -- user_id and referral_code are already indexed by their PRIMARY KEY/UNIQUE constraints.
+                DROP INDEX IF EXISTS idx_users_user_id;
+                DROP INDEX IF EXISTS idx_users_referral_code;
+                CREATE INDEX IF NOT EXISTS idx_users_leaderboard ON users(score DESC, wallet DESC) WHERE role = 'user';
 
                 CREATE TABLE IF NOT EXISTS transactions (
                     tx_id TEXT PRIMARY KEY,
@@ -88,6 +132,7 @@ def init_db():
                     FOREIGN KEY (user_id) REFERENCES users(user_id)
                 );
                 CREATE INDEX IF NOT EXISTS idx_transactions_user_id ON transactions(user_id);
+                CREATE INDEX IF NOT EXISTS idx_transactions_pending_created ON transactions(created_at DESC, tx_id DESC) WHERE status = 'pending';
 
                 CREATE TABLE IF NOT EXISTS referrals (
                     referral_id SERIAL PRIMARY KEY,
@@ -99,6 +144,7 @@ def init_db():
                     FOREIGN KEY (referee_id) REFERENCES users(user_id)
                 );
                 CREATE INDEX IF NOT EXISTS idx_referrals_referrer_id ON referrals(referrer_id);
+                CREATE INDEX IF NOT EXISTS idx_referrals_uncredited ON referrals(referrer_id) WHERE bonus_credited = FALSE;
 
                 CREATE TABLE IF NOT EXISTS withdrawals (
                     withdraw_id TEXT PRIMARY KEY,
@@ -110,90 +156,178 @@ def init_db():
                     admin_note TEXT
                 );
                 CREATE INDEX IF NOT EXISTS idx_withdrawals_user_id ON withdrawals(user_id);
+
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
             ''')
+            cursor.execute(
+                "INSERT INTO schema_version (version) VALUES (%s) ON CONFLICT DO NOTHING",
+                (SCHEMA_VERSION,)
+            )
             conn.commit()
-    finally:
-        release_db_connection(conn)
 
 # --- Utilities ---
+LEADERBOARD_CACHE_SECONDS = 30
+leaderboard_cache = {'ts': 0.0, 'text': None}
+leaderboard_lock = threading.Lock()
+
+def get_leaderboard_text():
+    """Return the rendered top-10 text, hitting the database at most once per LEADERBOARD_CACHE_SECONDS."""
+    if leaderboard_cache['text'] is not None and time.monotonic() - leaderboard_cache['ts'] < LEADERBOARD_CACHE_SECONDS:
+        return leaderboard_cache['text']
+    # Only one thread rebuilds on expiry. While it does, the others serve the
+    # stale text rather than parking their worker threads on the lock.
+    if not leaderboard_lock.acquire(blocking=leaderboard_cache['text'] is None):
+        return leaderboard_cache['text']
+    try:
+        now = time.monotonic()
+        if leaderboard_cache['text'] is not None and now - leaderboard_cache['ts'] < LEADERBOARD_CACHE_SECONDS:
+            return leaderboard_cache['text']
+        with db_connection(autocommit=True) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT username, score, wallet
+                    FROM users
+                    WHERE role = 'user'
+                    ORDER BY score DESC, wallet DESC
+                    LIMIT 10
+                    """
+                )
+                leaderboard = cursor.fetchall()
+        leaderboard_text = "🏆 Top 10 Players:\n"
+        for i, (username, score, wallet) in enumerate(leaderboard, 1):
+            leaderboard_text += f"{i}. {username or 'Anonymous'} - {score} points, {wallet} ETB\n"
+        leaderboard_cache.update(ts=now, text=leaderboard_text)
+        return leaderboard_text
+    finally:
+        leaderboard_lock.release()
+
+@lru_cache(maxsize=4096)
 def generate_referral_code(user_id):
-    import hashlib
     return hashlib.md5(str(user_id).encode()).hexdigest()[:8]
 
+ID_ALPHABET = string.ascii_uppercase + string.digits
+
 def generate_tx_id(user_id):
-    return f"TX{user_id}{''.join(random.choices(string.ascii_uppercase + string.digits, k=6))}"
+    return f"TX{user_id}{''.join(secrets.choice(ID_ALPHABET) for _ in range(6))}"
 
 def generate_withdraw_id(user_id):
-    return f"WD{user_id}{random.randint(1000, 9999)}"
+    return f"WD{user_id}{1000 + secrets.randbelow(9000)}"
 
-def check_referral_bonus(user_id):
+def check_referral_bonus(cursor, user_id):
+    """Credit any earned referral bonus using the caller's cursor, avoiding a second pool checkout."""
     REFERRAL_BONUS = 10
     REFERRAL_THRESHOLD = 20
-    conn = get_db_connection()
+    conn = cursor.connection
     try:
-        with conn.cursor() as cursor:
-            cursor.execute(
-                "SELECT COUNT(*) FROM referrals WHERE referrer_id = %s AND bonus_credited = FALSE",
-                (user_id,)
-            )
-            referral_count = cursor.fetchone()[0]
-            if referral_count >= REFERRAL_THRESHOLD:
-                bonuses_to_award = referral_count // REFERRAL_THRESHOLD
-                bonus_amount = bonuses_to_award * REFERRAL_BONUS
-                cursor.execute("UPDATE users SET wallet = wallet + %s WHERE user_id = %s", (bonus_amount, user_id))
-                cursor.execute(
-                    "UPDATE referrals SET bonus_credited = TRUE WHERE referrer_id = %s LIMIT %s",
-                    (user_id, bonuses_to_award * REFERRAL_THRESHOLD)
+        # One round trip: lock the uncredited referrals, mark the oldest whole
+        # multiple of the threshold, and credit the wallet for what was marked.
+        # No row comes back when nothing was earned, so users is not touched.
+        cursor.execute(
+            """
+            WITH pending AS (
+                SELECT referral_id FROM referrals
+                WHERE referrer_id = %(user_id)s AND bonus_credited = FALSE
+                ORDER BY referral_id
+                FOR UPDATE
+            ), marked AS (
+                UPDATE referrals SET bonus_credited = TRUE
+                WHERE referral_id IN (
+                    SELECT referral_id FROM pending
+                    ORDER BY referral_id
+                    LIMIT (SELECT COUNT(*) FROM pending) / %(threshold)s * %(threshold)s
                 )
-                conn.commit()
-                return bonus_amount
-            return 0
+                RETURNING 1
+            )
+            UPDATE users SET wallet = wallet + (SELECT COUNT(*) FROM marked) / %(threshold)s * %(bonus)s
+            WHERE user_id = %(user_id)s AND EXISTS (SELECT 1 FROM marked)
+            RETURNING (SELECT COUNT(*) FROM marked) / %(threshold)s * %(bonus)s
+            """,
+            {'user_id': user_id, 'threshold': REFERRAL_THRESHOLD, 'bonus': REFERRAL_BONUS}
+        )
+        result = cursor.fetchone()
+        conn.commit()
+        return result[0] if result else 0
     except Exception as e:
-        logger.error(f"Error checking referral bonus: {str(e)}")
+        conn.rollback()
+        logger.error("Error checking referral bonus: %s", e)
         return 0
-    finally:
-        release_db_connection(conn)
 
 
-def main_menu_keyboard(user_id):
-    logger.info("Generating main menu for user %s", user_id)
-    conn = get_db_connection()
-    try:
+# Registration never reverts, so a positive lookup is cached for the life of the process.
+registered_users = set()
+# Negative lookups expire, so a row created outside this process is picked up
+# within UNREGISTERED_CACHE_SECONDS.
+UNREGISTERED_CACHE_SECONDS = 300
+UNREGISTERED_CACHE_MAX = 10000
+unregistered_checked_at = {}
+
+def is_registered(user_id):
+    if user_id in registered_users:
+        return True
+    checked_at = unregistered_checked_at.get(user_id)
+    if checked_at is not None and time.monotonic() - checked_at < UNREGISTERED_CACHE_SECONDS:
+        return False
+    with db_connection(autocommit=True) as conn:
         with conn.cursor() as cursor:
             cursor.execute("SELECT 1 FROM users WHERE user_id = %s", (user_id,))
             registered = cursor.fetchone() is not None
-            keyboard = []
-            if registered:
-                keyboard.extend([
-                    [InlineKeyboardButton("💰 Check Balance", callback_data='check_balance')],
-                    [InlineKeyboardButton("🏆 Leaderboard", callback_data='leaderboard')],
-                    [InlineKeyboardButton("💳 Deposit", callback_data='deposit')],
-                    [InlineKeyboardButton("👥 Invite Friends", callback_data='invite')],
-                    [InlineKeyboardButton("📖 Instructions", callback_data='instructions')],
-                    [InlineKeyboardButton("🛟 Contact Support", callback_data='support')]
-                ])
-            else:
-                keyboard.extend([
-                    [InlineKeyboardButton("📝 Register", callback_data='register')],
-                    [InlineKeyboardButton("📖 Instructions", callback_data='instructions')],
-                    [InlineKeyboardButton("🛟 Contact Support", callback_data='support')]
-                ])
-            return InlineKeyboardMarkup(keyboard)
-    finally:
-        release_db_connection(conn)
+    if registered:
+        registered_users.add(user_id)
+        unregistered_checked_at.pop(user_id, None)
+    else:
+        if len(unregistered_checked_at) >= UNREGISTERED_CACHE_MAX:
+            unregistered_checked_at.clear()
+        unregistered_checked_at[user_id] = time.monotonic()
+    return registered
+
+BACK_TO_MENU_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton(BACK_BUTTON_TEXT, callback_data='back_to_menu')]])
+BACK_TO_ADMIN_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton(BACK_BUTTON_TEXT, callback_data='admin')]])
+ADMIN_PANEL_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📅 Create Game", callback_data="admin_create_game")],
+    [InlineKeyboardButton("📊 Stats", callback_data="admin_stats")],
+    [InlineKeyboardButton("✅ Verify Payments", callback_data="admin_verify")],
+    [InlineKeyboardButton("📢 Broadcast", callback_data="admin_broadcast")],
+    [InlineKeyboardButton("💸 Manage Withdrawals", callback_data="admin_withdrawals")]
+])
+PAYMENT_METHOD_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("Telebirr", callback_data="payment_telebirr")],
+    [InlineKeyboardButton("CBE", callback_data="payment_cbe")],
+    [InlineKeyboardButton(BACK_BUTTON_TEXT, callback_data='back_to_menu')]
+])
+REGISTERED_MENU_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("💰 Check Balance", callback_data='check_balance')],
+    [InlineKeyboardButton("🏆 Leaderboard", callback_data='leaderboard')],
+    [InlineKeyboardButton("💳 Deposit", callback_data='deposit')],
+    [InlineKeyboardButton("👥 Invite Friends", callback_data='invite')],
+    [InlineKeyboardButton("📖 Instructions", callback_data='instructions')],
+    [InlineKeyboardButton("🛟 Contact Support", callback_data='support')]
+])
+UNREGISTERED_MENU_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📝 Register", callback_data='register')],
+    [InlineKeyboardButton("📖 Instructions", callback_data='instructions')],
+    [InlineKeyboardButton("🛟 Contact Support", callback_data='support')]
+])
+
+def main_menu_keyboard(user_id):
+    logger.info("Generating main menu for user %s", user_id)
+    return REGISTERED_MENU_MARKUP if is_registered(user_id) else UNREGISTERED_MENU_MARKUP
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.info("Start handler triggered for user %s", update.effective_user.id)
     user = update.effective_user
     message = "🎉 Welcome to ዜቢ ቢንጎ! 🎉\n💰 Win prizes\n🎱 Play with friends!"
     try:
-        reply_markup = main_menu_keyboard(user.id)
+        reply_markup = await asyncio.to_thread(main_menu_keyboard, user.id)
         await update.message.reply_text(
             text=message,
             reply_markup=reply_markup
         )
     except Exception as e:
-        logger.error("Error in start handler: %s", str(e), exc_info=True)
+        logger.error("Error in start handler: %s", e, exc_info=True)
         await update.message.reply_text("❌ An error occurred. Please try again.")
 
 # --- Registration Handlers, Balance, Leaderboard, Deposit, Referrals, etc. ---
@@ -220,48 +354,52 @@ async def contact_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         reply_markup=ReplyKeyboardRemove()
     )
 
-async def username_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if 'awaiting_username' not in context.user_data:
-        return
-    username = update.message.text.strip()
-    if not (3 <= len(username) <= 20):
-        await update.message.reply_text("❌ Username must be 3-20 characters. Try again:")
-        return
-    conn = get_db_connection()
-    try:
+def register_user(user_id, phone, name, username):
+    """Create or complete the user's row and credit any referral bonus; returns the bonus amount."""
+    with db_connection() as conn:
         with conn.cursor() as cursor:
-            referral_code = generate_referral_code(update.effective_user.id)
+            referral_code = generate_referral_code(user_id)
             cursor.execute(
                 """
                 INSERT INTO users (user_id, phone, name, username, referral_code, wallet, score, role)
                 VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
                 ON CONFLICT (user_id) DO NOTHING
                 """,
-                (update.effective_user.id, context.user_data['phone'], context.user_data['name'],
-                 username, referral_code, 10, 0, 'user')
+                (user_id, phone, name, username, referral_code, 10, 0, 'user')
             )
             if cursor.rowcount == 0:
                 cursor.execute(
                     "UPDATE users SET username = %s WHERE user_id = %s AND username IS NULL",
-                    (username, update.effective_user.id)
+                    (username, user_id)
                 )
             conn.commit()
-            bonus = check_referral_bonus(update.effective_user.id)
-            message = f"🎉 Registration successful, {username}! 10 ETB credited."
-            if bonus > 0:
-                message += f"\nYou earned {bonus} ETB for referrals!"
-            await update.message.reply_text(
-                message,
-                reply_markup=main_menu_keyboard(update.effective_user.id)
-            )
-    finally:
-        release_db_connection(conn)
-        context.user_data.pop('awaiting_username', None)
+            registered_users.add(user_id)
+            unregistered_checked_at.pop(user_id, None)
+            return check_referral_bonus(cursor, user_id)
 
-async def instructions(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    try:
-        await update.callback_query.answer()
-        instructions_text = """
+async def username_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if 'awaiting_username' not in context.user_data:
+        return
+    username = update.message.text.strip()
+    if not (3 <= len(username) <= 20):
+        await update.message.reply_text("❌ Username must be 3-20 characters. Try again:")
+        return
+    user_id = update.effective_user.id
+    # Clear the state before awaiting so a second quick message from the same
+    # user, handled concurrently, cannot register twice.
+    context.user_data.pop('awaiting_username', None)
+    bonus = await asyncio.to_thread(
+        register_user, user_id, context.user_data['phone'], context.user_data['name'], username
+    )
+    message = f"🎉 Registration successful, {username}! 10 ETB credited."
+    if bonus > 0:
+        message += f"\nYou earned {bonus} ETB for referrals!"
+    await update.message.reply_text(
+        message,
+        reply_markup=await asyncio.to_thread(main_menu_keyboard, user_id)
+    )
+
+INSTRUCTIONS_TEXT = """
 📋 **የዜቢ ቢንጎ መመሪያዎች**
 
 🔹 **የመጀመሪያ ደረጃ:**
@@ -291,44 +429,48 @@ async def instructions(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 📝 ወደ ምርጡ ጨዋታ ይግቡ!
 """
+
+async def instructions(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    try:
+        await update.callback_query.answer()
         await update.callback_query.edit_message_text(
-            text=instructions_text,
-            reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton(BACK_BUTTON_TEXT, callback_data='back_to_menu')]
-            ]),
+            text=INSTRUCTIONS_TEXT,
+            reply_markup=BACK_TO_MENU_MARKUP,
             parse_mode='Markdown'
         )
     except Exception as e:
-        logger.error("Error in instructions handler: %s", str(e), exc_info=True)
+        logger.error("Error in instructions handler: %s", e, exc_info=True)
         await update.callback_query.message.reply_text("❌ Failed to load instructions.")
 
+def get_referral_code(user_id):
+    with db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT referral_code FROM users WHERE user_id = %s", (user_id,))
+            result = cursor.fetchone()
+            if result:
+                return result[0]
+            referral_code = generate_referral_code(user_id)
+            cursor.execute(
+                "UPDATE users SET referral_code = %s WHERE user_id = %s",
+                (referral_code, user_id)
+            )
+            conn.commit()
+            return referral_code
+
 async def invite_friends(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.info("Invite friends handler triggered for user %s", update.effective_user.id)
     user_id = update.effective_user.id
     try:
         await update.callback_query.answer()
-        conn = get_db_connection()
-        try:
-            with conn.cursor() as cursor:
-                cursor.execute("SELECT referral_code FROM users WHERE user_id = %s", (user_id,))
-                result = cursor.fetchone()
-                referral_code = result[0] if result else generate_referral_code(user_id)
-                if not result:
-                    cursor.execute(
-                        "UPDATE users SET referral_code = %s WHERE user_id = %s",
-                        (referral_code, user_id)
-                    )
-                    conn.commit()
-                invite_link = f"https://t.me/{context.bot.username}?start=ref_{referral_code}"
-                message = f"👥 Invite friends and earn 10 ETB per referral!\nYour link: {invite_link}"
-                await update.callback_query.edit_message_text(
-                    text=message,
-                    reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton(BACK_BUTTON_TEXT, callback_data='back_to_menu')]])
-                )
-        finally:
-            release_db_connection(conn)
+        referral_code = await asyncio.to_thread(get_referral_code, user_id)
+        invite_link = f"https://t.me/{context.bot.username}?start=ref_{referral_code}"
+        message = f"👥 Invite friends and earn 10 ETB per referral!\nYour link: {invite_link}"
+        await update.callback_query.edit_message_text(
+            text=message,
+            reply_markup=BACK_TO_MENU_MARKUP
+        )
     except Exception as e:
-        logger.error("Error in invite_friends handler: %s", str(e), exc_info=True)
+        logger.error("Error in invite_friends handler: %s", e, exc_info=True)
         await update.callback_query.message.reply_text("❌ Failed to generate invite link.")
 
 async def contact_support(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -337,61 +479,43 @@ async def contact_support(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.callback_query.answer()
         await update.callback_query.edit_message_text(
             text="🛟 Contact Support\n\nFor help, contact @ZebiSupportBot\nAvailable 24/7!",
-            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton(BACK_BUTTON_TEXT, callback_data='back_to_menu')]])
+            reply_markup=BACK_TO_MENU_MARKUP
         )
     except Exception as e:
-        logger.error("Error in contact_support handler: %s", str(e), exc_info=True)
+        logger.error("Error in contact_support handler: %s", e, exc_info=True)
         await update.callback_query.message.reply_text("❌ Failed to load support info.")
 
+def get_wallet(user_id):
+    with db_connection(autocommit=True) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT wallet FROM users WHERE user_id = %s", (user_id,))
+            result = cursor.fetchone()
+            return result[0] if result else 0
+
 async def check_balance(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.info("Check balance handler triggered for user %s", update.effective_user.id)
     user_id = update.effective_user.id
     try:
         await update.callback_query.answer()
-        conn = get_db_connection()
-        try:
-            with conn.cursor() as cursor:
-                cursor.execute("SELECT wallet FROM users WHERE user_id = %s", (user_id,))
-                result = cursor.fetchone()
-                balance = result[0] if result else 0
-                await update.callback_query.edit_message_text(
-                    text=f"💰 Your balance: {balance} ETB",
-                    reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton(BACK_BUTTON_TEXT, callback_data='back_to_menu')]])
-                )
-        finally:
-            release_db_connection(conn)
+        balance = await asyncio.to_thread(get_wallet, user_id)
+        await update.callback_query.edit_message_text(
+            text=f"💰 Your balance: {balance} ETB",
+            reply_markup=BACK_TO_MENU_MARKUP
+        )
     except Exception as e:
-        logger.error("Error in check_balance handler: %s", str(e), exc_info=True)
+        logger.error("Error in check_balance handler: %s", e, exc_info=True)
         await update.callback_query.message.reply_text("❌ Failed to check balance.")
 
 async def show_leaderboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.info("Leaderboard handler triggered for user %s", update.effective_user.id)
     try:
         await update.callback_query.answer()
-        conn = get_db_connection()
-        try:
-            with conn.cursor() as cursor:
-                cursor.execute(
-                    """
-                    SELECT username, score, wallet
-                    FROM users
-                    WHERE role = 'user'
-                    ORDER BY score DESC, wallet DESC
-                    LIMIT 10
-                    """
-                )
-                leaderboard = cursor.fetchall()
-                leaderboard_text = "🏆 Top 10 Players:\n"
-                for i, (username, score, wallet) in enumerate(leaderboard, 1):
-                    leaderboard_text += f"{i}. {username or 'Anonymous'} - {score} points, {wallet} ETB\n"
-                await update.callback_query.edit_message_text(
-                    text=leaderboard_text,
-                    reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton(BACK_BUTTON_TEXT, callback_data='back_to_menu')]])
-                )
-        finally:
-            release_db_connection(conn)
+        await update.callback_query.edit_message_text(
+            text=await asyncio.to_thread(get_leaderboard_text),
+            reply_markup=BACK_TO_MENU_MARKUP
+        )
     except Exception as e:
-        logger.error("Error in leaderboard handler: %s", str(e), exc_info=True)
+        logger.error("Error in leaderboard handler: %s", e, exc_info=True)
         await update.callback_query.message.reply_text("❌ Failed to load leaderboard.")
 
 async def deposit(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -400,17 +524,17 @@ async def deposit(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.callback_query.answer()
         await update.callback_query.edit_message_text(
             text="💳 Please enter the deposit amount (ETB):",
-            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton(BACK_BUTTON_TEXT, callback_data='back_to_menu')]])
+            reply_markup=BACK_TO_MENU_MARKUP
         )
     except Exception as e:
-        logger.error("Error in deposit handler: %s", str(e), exc_info=True)
+        logger.error("Error in deposit handler: %s", e, exc_info=True)
         await update.callback_query.message.reply_text("❌ Failed to initiate deposit.")
             
 async def process_deposit_amount(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     try:
         if 'awaiting_deposit' not in context.user_data:
-            logger.warning(f"User {user_id} attempted deposit without proper state")
+            logger.warning("User %s attempted deposit without proper state", user_id)
             return
 
         amount_text = update.message.text.strip()
@@ -425,12 +549,12 @@ async def process_deposit_amount(update: Update, context: ContextTypes.DEFAULT_T
             return
 
         context.user_data['deposit_amount'] = amount
-        logger.info(f"User {user_id} entered deposit amount: {amount} ETB")
+        logger.info("User %s entered deposit amount: %s ETB", user_id, amount)
         context.user_data.pop('awaiting_deposit', None)  # Success: clear state
         await show_payment_options(update, context)
 
     except Exception as e:
-        logger.error(f"Error processing deposit for user {user_id}: {e}")
+        logger.error("Error processing deposit for user %s: %s", user_id, e)
         await update.message.reply_text("❌ An error occurred. Please try again.")
         context.user_data.pop('awaiting_deposit', None)  # On error, clear state
 
@@ -438,27 +562,34 @@ async def show_payment_options(update: Update, context: ContextTypes.DEFAULT_TYP
     user_id = update.effective_user.id
     try:
         if 'deposit_amount' not in context.user_data:
-            logger.warning(f"User {user_id} accessed payment options without amount")
+            logger.warning("User %s accessed payment options without amount", user_id)
             await update.message.reply_text("⚠️ Please start the deposit process again.")
             return
 
         amount = context.user_data['deposit_amount']
-        keyboard = InlineKeyboardMarkup([
-            [InlineKeyboardButton("Telebirr", callback_data="payment_telebirr")],
-            [InlineKeyboardButton("CBE", callback_data="payment_cbe")],
-            [InlineKeyboardButton(BACK_BUTTON_TEXT, callback_data='back_to_menu')]
-        ])
-        logger.info(f"Showing payment options to user {user_id} for {amount} ETB")
+        logger.info("Showing payment options to user %s for %s ETB", user_id, amount)
         await update.message.reply_text(
             f"💳 Select payment method for {amount} ETB:",
-            reply_markup=keyboard
+            reply_markup=PAYMENT_METHOD_MARKUP
         )
 
     except Exception as e:
-        logger.error(f"Error showing payment options to user {user_id}: {e}")
+        logger.error("Error showing payment options to user %s: %s", user_id, e)
         await update.message.reply_text("❌ Failed to load payment options. Please try again.")
 
 
+def create_deposit(user_id, amount, method):
+    """Record a pending deposit and return its tx_id."""
+    tx_id = generate_tx_id(user_id)
+    with db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO transactions (tx_id, user_id, amount, method, verification_code) VALUES (%s, %s, %s, %s, %s)",
+                (tx_id, user_id, amount, method, tx_id[-6:])
+            )
+            conn.commit()
+    return tx_id
+
 async def handle_payment_method(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     user_id = query.from_user.id
@@ -466,24 +597,13 @@ async def handle_payment_method(update: Update, context: ContextTypes.DEFAULT_TY
         await query.answer()
 
         if 'deposit_amount' not in context.user_data:
-            logger.warning(f"User {user_id} selected payment without amount")
+            logger.warning("User %s selected payment without amount", user_id)
             await query.edit_message_text("⚠️ Deposit session expired. Please start over.")
             return
 
         method = query.data.split('_')[1].lower()
         amount = context.user_data['deposit_amount']
-        tx_id = generate_tx_id(user_id)
-
-        conn = get_db_connection()
-        try:
-            with conn.cursor() as cursor:
-                cursor.execute(
-                    "INSERT INTO transactions (tx_id, user_id, amount, method, verification_code) VALUES (%s, %s, %s, %s, %s)",
-                    (tx_id, user_id, amount, method, tx_id[-6:])
-                )
-                conn.commit()
-        finally:
-            release_db_connection(conn)
+        tx_id = await asyncio.to_thread(create_deposit, user_id, amount, method)
 
         if method == 'telebirr':
             payment_details = f"""📋 Telebirr Payment Instructions:
@@ -518,23 +638,19 @@ Name: ናትናኤል ዳንኤል
 1. አጭር የጹሁፍ መለክት(sms) ካልደረሳቹ ያለትራንዛክሽን ቁጥር ሲስተሙ ዋሌት ስለማይሞላላቹ የከፈላችሁበትን ደረሰኝ ከባንክ በመቀበል በማንኛውም ሰአት ትራንዛክሽን ቁጥሩን ቦቱ ላይ ማስገባት ትችላላቹ
 2.  ዲፖዚት ባረጋቹ ቁጥር ቦቱ የሚያገናኛቹ ኤጀንቶች ስለሚለያዩ ከላይ ወደሚሰጣቹ የኢትዮጵያ ንግድ ባንክ አካውንት ብቻ ብር መላካችሁን እርግጠኛ ይሁኑ።"""
 
-        logger.info(f"User {user_id} selected {method} payment for {amount} ETB")
+        logger.info("User %s selected %s payment for %s ETB", user_id, method, amount)
         await query.edit_message_text(
             f"✅ Payment method selected\n\n{payment_details}\n"
             "Please complete the payment and send the confirmation.",
-            reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton(BACK_BUTTON_TEXT, callback_data='back_to_menu')]
-            ])
+            reply_markup=BACK_TO_MENU_MARKUP
         )
         context.user_data.pop('deposit_amount', None)  # Optionally clear
 
     except Exception as e:
-        logger.error(f"Error handling payment method for user {user_id}: {e}")
+        logger.error("Error handling payment method for user %s: %s", user_id, e)
         await query.edit_message_text(
             "❌ Failed to process payment selection.",
-            reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton(BACK_BUTTON_TEXT, callback_data='back_to_menu')]
-            ])
+            reply_markup=BACK_TO_MENU_MARKUP
         )
 
 async def admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -543,140 +659,225 @@ async def admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
         await update.message.reply_text(
             "🛠 Admin Panel",
-            reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton("📅 Create Game", callback_data="admin_create_game")],
-                [InlineKeyboardButton("📊 Stats", callback_data="admin_stats")],
-                [InlineKeyboardButton("✅ Verify Payments", callback_data="admin_verify")],
-                [InlineKeyboardButton("📢 Broadcast", callback_data="admin_broadcast")],
-                [InlineKeyboardButton("💸 Manage Withdrawals", callback_data="admin_withdrawals")]
-            ])
+            reply_markup=ADMIN_PANEL_MARKUP
         )
     except Exception as e:
-        logger.error(f"Error in admin: {str(e)}")
+        logger.error("Error in admin: %s", e)
         await update.message.reply_text("❌ Error accessing admin panel.")
 
+VERIFY_PAGE_SIZE = 20
+
+def get_pending_transactions(page):
+    with db_connection(autocommit=True) as conn:
+        with conn.cursor() as cursor:
+            # One extra row tells us whether a next page exists.
+            cursor.execute(
+                """
+                SELECT tx_id, user_id, amount FROM transactions
+                WHERE status = 'pending'
+                ORDER BY created_at DESC, tx_id DESC
+                LIMIT %s OFFSET %s
+                """,
+                (VERIFY_PAGE_SIZE + 1, page * VERIFY_PAGE_SIZE)
+            )
+            return cursor.fetchall()
+
+async def admin_verify_list(query, context, page=0):
+    pending_txs = await asyncio.to_thread(get_pending_transactions, page)
+
+    if not pending_txs:
+        await query.edit_message_text(
+            "✅ No pending transactions.",
+            reply_markup=BACK_TO_ADMIN_MARKUP
+        )
+        return
+
+    keyboard = [
+        [InlineKeyboardButton(f"TX {tx[0]} - User {tx[1]} - {tx[2]} ETB",
+         callback_data=f"verify_{tx[0]}")]
+        for tx in pending_txs[:VERIFY_PAGE_SIZE]
+    ]
+    nav = []
+    if page > 0:
+        nav.append(InlineKeyboardButton("⬅ Prev", callback_data=f"admin_verify_p{page - 1}"))
+    if len(pending_txs) > VERIFY_PAGE_SIZE:
+        nav.append(InlineKeyboardButton("Next ➡", callback_data=f"admin_verify_p{page + 1}"))
+    if nav:
+        keyboard.append(nav)
+    keyboard.append([InlineKeyboardButton(BACK_BUTTON_TEXT, callback_data='admin')])
+
+    await query.edit_message_text(
+        "📋 Pending Transactions:",
+        reply_markup=InlineKeyboardMarkup(keyboard)
+    )
+
+async def admin_verify_page(query, context):
+    page = query.data[len('admin_verify_p'):]
+    await admin_verify_list(query, context, int(page) if page.isdigit() else 0)
+
+async def admin_panel(query, context):
+    await query.edit_message_text(
+        "🛠 Admin Panel",
+        reply_markup=ADMIN_PANEL_MARKUP
+    )
+
+# Admin callback_data -> action. Stats and withdrawal management are not
+# implemented yet, so admin_stats and admin_withdrawals are simply absent and
+# ignored like any unknown action.
+ADMIN_ROUTES = {
+    'admin': admin_panel,
+    'admin_verify': admin_verify_list,
+}
+ADMIN_PREFIX_ROUTES = (
+    ('admin_verify_p', admin_verify_page),
+)
+
 async def admin_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     user_id = update.effective_user.id
     try:
-        await query.answer()
-
         if user_id not in ADMIN_IDS:
-            logger.warning(f"Unauthorized admin access attempt by {user_id}")
-            await query.edit_message_text("⛔ Unauthorized access.")
+            logger.warning("Unauthorized admin access attempt by %s", user_id)
+            await query.answer("⛔ Unauthorized access.", cache_time=60)
             return
 
-        action = query.data.split('_')[1]
-        if action == "verify":
-            conn = get_db_connection()
-            try:
-                with conn.cursor() as cursor:
-                    cursor.execute(
-                        "SELECT tx_id, user_id, amount FROM transactions WHERE status = 'pending'"
-                    )
-                    pending_txs = cursor.fetchall()
-
-                if not pending_txs:
-                    await query.edit_message_text(
-                        "✅ No pending transactions.",
-                        reply_markup=InlineKeyboardMarkup([
-                            [InlineKeyboardButton(BACK_BUTTON_TEXT, callback_data='admin')]
-                        ])
-                    )
-                    return
-
-                keyboard = [
-                    [InlineKeyboardButton(f"TX {tx[0]} - User {tx[1]} - {tx[2]} ETB",
-                     callback_data=f"verify_{tx[0]}")]
-                    for tx in pending_txs
-                ]
-                keyboard.append([InlineKeyboardButton(BACK_BUTTON_TEXT, callback_data='admin')])
-
-                await query.edit_message_text(
-                    "📋 Pending Transactions:",
-                    reply_markup=InlineKeyboardMarkup(keyboard)
-                )
-
-            finally:
-                release_db_connection(conn)
-        elif action == "withdrawals":
-            # Similar pattern for withdrawals handling
-            pass
+        await query.answer()
+        route = ADMIN_ROUTES.get(query.data) or next(
+            (handler for prefix, handler in ADMIN_PREFIX_ROUTES if query.data.startswith(prefix)), None
+        )
+        if route is not None:
+            await route(query, context)
 
     except Exception as e:
-        logger.error(f"Error in admin_handler for user {user_id}: {e}")
+        logger.error("Error in admin_handler for user %s: %s", user_id, e)
         await query.edit_message_text(
             "❌ Admin action failed.",
-            reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton(BACK_BUTTON_TEXT, callback_data='admin')]
-            ])
+            reply_markup=BACK_TO_ADMIN_MARKUP
         )
 
+# Telegram caps bots at roughly 30 messages per second; each send holds its
+# slot for a second so the fan-out stays under that limit.
+BROADCAST_CONCURRENCY = 30
+BROADCAST_MAX_ATTEMPTS = 5
+
+async def send_broadcast(bot, user_ids, text):
+    """Send text to every user concurrently within the rate limit; returns the number delivered."""
+    semaphore = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+    loop = asyncio.get_running_loop()
+    # A RetryAfter means the whole bot is flood-limited, so every sender waits
+    # until this shared deadline, not just the one that got the error.
+    resume_at = 0.0
+
+    async def send_one(uid):
+        nonlocal resume_at
+        async with semaphore:
+            try:
+                for _ in range(BROADCAST_MAX_ATTEMPTS):
+                    while (delay := resume_at - loop.time()) > 0:
+                        await asyncio.sleep(delay)
+                    try:
+                        await bot.send_message(chat_id=uid, text=text)
+                        return True
+                    except RetryAfter as e:
+                        resume_at = max(resume_at, loop.time() + e.retry_after)
+                logger.warning("Gave up sending to user %s after repeated flood limits", uid)
+                return False
+            except Exception as e:
+                logger.warning("Failed to send to user %s: %s", uid, e)
+                return False
+            finally:
+                await asyncio.sleep(1)
+
+    results = await asyncio.gather(*(send_one(uid) for uid in user_ids))
+    return sum(results)
+
+def get_all_user_ids():
+    with db_connection(autocommit=True) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT user_id FROM users")
+            return [row[0] for row in cursor.fetchall()]
+
+async def run_broadcast(bot, chat_id, text):
+    user_ids = await asyncio.to_thread(get_all_user_ids)
+    success = await send_broadcast(bot, user_ids, f"📢 Announcement:\n\n{text}")
+    await bot.send_message(
+        chat_id=chat_id,
+        text=f"📢 Broadcast sent to {success}/{len(user_ids)} users.",
+        reply_markup=BACK_TO_ADMIN_MARKUP
+    )
+
 async def process_admin_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     try:
         if user_id not in ADMIN_IDS:
-            logger.warning(f"Unauthorized admin input attempt by {user_id}")
+            logger.warning("Unauthorized admin input attempt by %s", user_id)
             return
 
         text = update.message.text
 
         if 'awaiting_broadcast' in context.user_data:
-            conn = get_db_connection()
-            try:
-                with conn.cursor() as cursor:
-                    cursor.execute("SELECT user_id FROM users")
-                    user_ids = [row[0] for row in cursor.fetchall()]
-
-                success = 0
-                for uid in user_ids:
-                    try:
-                        await context.bot.send_message(
-                            chat_id=uid,
-                            text=f"📢 Announcement:\n\n{text}"
-                        )
-                        success += 1
-                    except Exception as e:
-                        logger.warning(f"Failed to send to user {uid}: {e}")
-
-                await update.message.reply_text(
-                    f"📢 Broadcast sent to {success}/{len(user_ids)} users.",
-                    reply_markup=InlineKeyboardMarkup([
-                        [InlineKeyboardButton(BACK_BUTTON_TEXT, callback_data='admin')]
-                    ])
-                )
-
-            finally:
-                release_db_connection(conn)
-                context.user_data.pop('awaiting_broadcast', None)
+            context.user_data.pop('awaiting_broadcast', None)
+            await update.message.reply_text("📢 Broadcast started. You will get a summary when it finishes.")
+            # The fan-out can take minutes; run it in the background so the
+            # admin's other updates are not queued behind it.
+            context.application.create_task(
+                run_broadcast(context.bot, update.effective_chat.id, text), update=update
+            )
 
     except Exception as e:
-        logger.error(f"Error processing admin input for user {user_id}: {e}")
+        logger.error("Error processing admin input for user %s: %s", user_id, e)
         await update.message.reply_text(
             "❌ Failed to process admin command.",
-            reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton(BACK_BUTTON_TEXT, callback_data='admin')]
-            ])
+            reply_markup=BACK_TO_ADMIN_MARKUP
         )
 
 
 # Add similar minimal handlers for deposits, withdrawals, admin, etc. as in your previous version,
 # but ensure you remove any reference to webapp URLs and static file serving.
 
+# Telegram clients can deliver the same callback twice on a rapid double-click.
+CALLBACK_DEBOUNCE_SECONDS = 1.0
+recent_callbacks = {}
+
+def is_duplicate_callback(user_id, data):
+    now = time.monotonic()
+    key = (user_id, data)
+    last = recent_callbacks.get(key)
+    recent_callbacks[key] = now
+    if len(recent_callbacks) > 10000:
+        for stale in [k for k, ts in recent_callbacks.items() if now - ts >= CALLBACK_DEBOUNCE_SECONDS]:
+            del recent_callbacks[stale]
+    return last is not None and now - last < CALLBACK_DEBOUNCE_SECONDS
+
+async def debounce_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    if is_duplicate_callback(query.from_user.id, query.data):
+        await query.answer()
+        raise ApplicationHandlerStop
+
+async def text_router(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Send free text to the one flow waiting for it, instead of running every text handler."""
+    if 'awaiting_broadcast' in context.user_data:
+        await process_admin_input(update, context)
+    elif 'awaiting_username' in context.user_data:
+        await username_handler(update, context)
+    elif 'awaiting_deposit' in context.user_data:
+        await process_deposit_amount(update, context)
+
 async def back_to_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.info("Back to menu handler triggered for user %s", update.effective_user.id)
     try:
         await update.callback_query.answer()
         await update.callback_query.edit_message_text(
             text="🎉 Welcome back to ዜቢ ቢንጎ!",
-            reply_markup=main_menu_keyboard(update.effective_user.id)
+            reply_markup=await asyncio.to_thread(main_menu_keyboard, update.effective_user.id)
         )
     except Exception as e:
-        logger.error("Error in back_to_menu handler: %s", str(e), exc_info=True)
+        logger.error("Error in back_to_menu handler: %s", e, exc_info=True)
         await update.callback_query.message.reply_text("❌ Failed to return to menu.")
 
 async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    logger.error(f"Update {update} caused error {context.error}", exc_info=True)
+    logger.error("Update %s caused error %s", update, context.error, exc_info=True)
     try:
         if update and update.effective_message:
             await context.bot.send_message(
@@ -684,24 +885,29 @@ async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 text="❌ Error occurred. Please try again or contact support."
             )
     except Exception as e:
-        logger.error(f"Error in error_handler: {str(e)}", exc_info=True)
+        logger.error("Error in error_handler: %s", e, exc_info=True)
 
 application = None
 def setup_bot():
     global application
-    application = ApplicationBuilder().token(TOKEN).build()
+    # Handle updates concurrently so one slow handler does not hold up every
+    # other chat; the default processes them strictly one at a time.
+    application = ApplicationBuilder().token(TOKEN).concurrent_updates(UPDATE_CONCURRENCY).build()
     # Register handlers
+    application.add_handler(CallbackQueryHandler(debounce_callback), group=-1)
     application.add_handler(CommandHandler("start", start))
     logger.info("Registered handlers: %s", application.handlers)
     application.add_handler(CallbackQueryHandler(register, pattern='^register$'))
-    application.add_handler(CallbackQueryHandler(instructions, pattern='instructions$'))
-    application.add_handler(CallbackQueryHandler(invite_friends, pattern='invite$'))
-    application.add_handler(CallbackQueryHandler(contact_support, pattern='support$'))
-    application.add_handler(CallbackQueryHandler(check_balance, pattern='check_balance$'))
-    application.add_handler(CallbackQueryHandler(show_leaderboard, pattern='leaderboard$'))
-    application.add_handler(CallbackQueryHandler(back_to_menu, pattern='back_to_menu$'))
+    application.add_handler(CallbackQueryHandler(instructions, pattern='^instructions$'))
+    application.add_handler(CallbackQueryHandler(invite_friends, pattern='^invite$'))
+    application.add_handler(CallbackQueryHandler(contact_support, pattern='^support$'))
+    application.add_handler(CallbackQueryHandler(check_balance, pattern='^check_balance$'))
+    application.add_handler(CallbackQueryHandler(show_leaderboard, pattern='^leaderboard$'))
+    application.add_handler(CallbackQueryHandler(back_to_menu, pattern='^back_to_menu$'))
+    application.add_handler(CommandHandler("admin", admin))
+    application.add_handler(CallbackQueryHandler(admin_handler, pattern='^admin(_|$)'))
     application.add_handler(MessageHandler(filters.CONTACT, contact_handler))
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, username_handler), group=1)
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, text_router))
     application.add_error_handler(error_handler)
     
 # --- Main ---
@@ -712,6 +918,6 @@ if __name__ == "__main__":
         application.run_polling()
         logger.info("Bot started with polling")
     except Exception as e:
-        logger.error("Startup error: %s", str(e), exc_info=True)
+        logger.error("Startup error: %s", e, exc_info=True)
         raise
 